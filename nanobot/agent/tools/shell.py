@@ -3,11 +3,49 @@
 import asyncio
 import os
 import re
+import signal
+from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Any
 
 from nanobot.agent.tools.base import Tool
 
+# Small reads keep per-chunk copies cheap once the output buffer is full.
+_READ_CHUNK_SIZE = 4096
+
+
+# UTF-8 continuation bytes; every other byte starts a new char.
+_UTF8_CONTINUATION = bytes(range(0x80, 0xC0))
+
+
+@dataclass
+class _OutputBuffer:
+    """Keeps the first ``capacity`` bytes of a stream and counts the chars in the rest."""
+
+    capacity: int
+    data: bytearray = field(default_factory=bytearray)
+    dropped: int = 0
+
+    def write(self, chunk: bytes) -> None:
+        room = max(self.capacity - len(self.data), 0)
+        if room:
+            self.data += chunk[:room]
+        if len(chunk) > room:
+            self.dropped += len(chunk[room:].translate(None, _UTF8_CONTINUATION))
+
+
+async def _read_into(stream: asyncio.StreamReader | None, buf: _OutputBuffer) -> None:
+    """Drain ``stream`` to EOF so the child never blocks on a full pipe.
+
+    Reading continues past the buffer's capacity instead of killing the
+    process: commands with side effects (installs, builds) must be allowed
+    to finish even when their log is longer than we report.
+    """
+    if stream is None:
+        return
+    while chunk := await stream.read(_READ_CHUNK_SIZE):
+        buf.write(chunk)
+
 
 class ExecTool(Tool):
     """Tool to execute shell commands."""
@@ -81,11 +119,7 @@ class ExecTool(Tool):
 
         effective_timeout = kwargs.get("timeout", self.timeout)
 
-        env = os.environ.copy()
-        for key in self.env_strip:
-            env.pop(key, None)
-        if self.path_append:
-            env["PATH"] = env.get("PATH", "") + os.pathsep + self.path_append
+        env = self._build_env()
 
         try:
             process = await asyncio.create_subprocess_shell(
@@ -94,24 +128,38 @@ class ExecTool(Tool):
                 stderr=asyncio.subprocess.PIPE,
                 cwd=cwd,
                 env=env,
+                # Own process group, so a timeout can take down anything the
+                # command started in the background as well.
+                start_new_session=True,
             )
 
+            # Only the head of each stream can reach the result, so memory
+            # stays bounded however much the command prints. UTF-8 needs at
+            # most 4 bytes per char.
+            stdout_buf = _OutputBuffer(self.max_output_chars * 4)
+            stderr_buf = _OutputBuffer(self.max_output_chars * 4)
+
             try:
-                stdout, stderr = await asyncio.wait_for(
-                    process.communicate(),
-                    timeout=effective_timeout
-                )
-            except asyncio.TimeoutError:
-                process.kill()
+                async with asyncio.timeout(effective_timeout):
+                    await self._collect_output(process, stdout_buf, stderr_buf)
+            except TimeoutError:
+                self._kill(process)
                 # Wait for the process to fully terminate so pipes are
                 # drained and file descriptors are released.
                 try:
-                    await asyncio.wait_for(process.wait(), timeout=5.0)
-                except asyncio.TimeoutError:
+                    async with asyncio.timeout(5.0):
+                        await process.wait()
+                except TimeoutError:
                     pass
                 return f"Error: Command timed out after {effective_timeout} seconds"
+            except asyncio.CancelledError:
+                # /stop, Ctrl-C and shutdown cancel the task; the command is
+                # in its own session, so nothing else would stop it.
+                self._kill(process)
+                raise
             
             output_parts = []
+            stdout, stderr = stdout_buf.data, stderr_buf.data
             
             if stdout:
                 output_parts.append(stdout.decode("utf-8", errors="replace"))
@@ -128,14 +176,55 @@ class ExecTool(Tool):
             
             # Truncate very long output
             max_len = self.max_output_chars
-            if len(result) > max_len:
-                result = result[:max_len] + f"\n... (truncated, {len(result) - max_len} more chars)"
+            dropped = stdout_buf.dropped + stderr_buf.dropped
+            if len(result) > max_len or dropped:
+                more = max(len(result) - max_len, 0) + dropped
+                result = result[:max_len] + f"\n... (truncated, {more} more chars)"
             
             return result
             
         except Exception as e:
             return f"Error executing command: {str(e)}"
 
+    def _build_env(self) -> dict[str, str]:
+        """Environment for the child: ours minus env_strip, plus path_append."""
+        env = os.environ.copy()
+        for key in self.env_strip:
+            env.pop(key, None)
+        if self.path_append:
+            env["PATH"] = env.get("PATH", "") + os.pathsep + self.path_append
+        return env
+
+    @staticmethod
+    async def _collect_output(
+        process: asyncio.subprocess.Process,
+        stdout_buf: _OutputBuffer,
+        stderr_buf: _OutputBuffer,
+    ) -> None:
+        """Stream both pipes into their buffers, then reap the process."""
+        await asyncio.gather(
+            _read_into(process.stdout, stdout_buf),
+            _read_into(process.stderr, stderr_buf),
+        )
+        await process.wait()
+
+    @staticmethod
+    def _kill(process: asyncio.subprocess.Process) -> None:
+        """Kill the command's whole process group, falling back to the shell alone."""
+        if hasattr(os, "killpg"):
+            try:
+                os.killpg(process.pid, signal.SIGKILL)
+                return
+            except ProcessLookupError:
+                return
+            except OSError:
+                # e.g. EPERM on macOS when only zombies are left in the group.
+                pass
+        try:
+            process.kill()
+        except ProcessLookupError:
+            pass
+
     def _guard_command(self, command: str, cwd: str) -> str | None:
         """Best-effort safety guard for potentially destructive commands."""
         cmd = command.strip()
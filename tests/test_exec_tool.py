@@ -1,61 +1,233 @@
 """Tests for ExecTool env_strip, per-call timeout, and max_output_chars."""
 
+import asyncio
 import os
+import sys
+import tracemalloc
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
 
 import pytest
 
-from nanobot.agent.tools.shell import ExecTool
+from nanobot.agent.tools.shell import ExecTool, _OutputBuffer
+
+
+class _FakeClock:
+    """Stand-in for ``loop.time`` that can be moved forward on demand."""
+
+    def __init__(self, time_fn: Callable[[], float]) -> None:
+        self._time_fn = time_fn
+        self.offset = 0.0
+
+    def __call__(self) -> float:
+        return self._time_fn() + self.offset
+
+    def advance(self, seconds: float) -> None:
+        self.offset += seconds
+
+
+class _MockStream:
+    """Fake ``asyncio.StreamReader`` that replays ``data`` ``repeat`` times."""
+
+    def __init__(self, data: bytes = b"", repeat: int = 1) -> None:
+        self._data = data
+        self.remaining = repeat if data else 0
+        self.read_sizes: list[int] = []
+
+    async def read(self, n: int = -1) -> bytes:
+        self.read_sizes.append(n)
+        if not self.remaining:
+            return b""
+        self.remaining -= 1
+        return self._data
+
+
+class _MockProcess:
+    """Fake subprocess that returns canned output without forking."""
+
+    def __init__(self, stdout: bytes = b"", stderr: bytes = b"", returncode: int = 0) -> None:
+        self.stdout = _MockStream(stdout)
+        self.stderr = _MockStream(stderr)
+        self.returncode: int | None = returncode
+        self.pid = -1
+        self.kill_calls = 0
+
+    async def wait(self) -> int | None:
+        return self.returncode
+
+    def kill(self) -> None:
+        self.kill_calls += 1
+
+
+class _HangingStream:
+    def __init__(self, process: "_HangingProcess") -> None:
+        self._process = process
+
+    async def read(self, n: int = -1) -> bytes:
+        self._process.started.set()
+        await self._process.killed.wait()
+        return b""
+
+
+class _HangingProcess(_MockProcess):
+    """Fake subprocess that never produces output until it is killed."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.returncode = None
+        self.started = asyncio.Event()
+        self.killed = asyncio.Event()
+        self.stdout = self.stderr = _HangingStream(self)  # type: ignore[assignment]
+
+    async def wait(self) -> int | None:
+        await self.killed.wait()
+        return self.returncode
+
+    def kill(self) -> None:
+        super().kill()
+        self.returncode = -9
+        self.killed.set()
+
+
+@pytest.fixture
+async def fake_clock(monkeypatch: pytest.MonkeyPatch) -> _FakeClock:
+    loop = asyncio.get_running_loop()
+    clock = _FakeClock(loop.time)
+    monkeypatch.setattr(loop, "time", clock)
+    return clock
+
+
+def _patch_subprocess(monkeypatch: pytest.MonkeyPatch, process: _MockProcess) -> None:
+    async def _create(*args, **kwargs):  # type: ignore[no-untyped-def]
+        return process
+
+    monkeypatch.setattr("nanobot.agent.tools.shell.asyncio.create_subprocess_shell", _create)
+    # Never signal a real process group on behalf of a fake process.
+    monkeypatch.setattr("nanobot.agent.tools.shell.os.killpg", lambda pid, sig: process.kill())
+
+
+async def _execute_until_timeout(
+    monkeypatch: pytest.MonkeyPatch, tool: ExecTool, clock: _FakeClock, seconds: float, **kwargs: int
+) -> str:
+    """Run ``tool.execute`` against a hanging process and jump the clock past the timeout."""
+    process = _HangingProcess()
+    _patch_subprocess(monkeypatch, process)
+    task = asyncio.create_task(tool.execute("sleep 5", **kwargs))
+    await process.started.wait()
+    clock.advance(seconds)
+    return await task
+
+
+def _is_alive(pid: int) -> bool:
+    """True unless ``pid`` is gone or a zombie waiting to be reaped."""
+    try:
+        stat = Path(f"/proc/{pid}/stat").read_text()
+    except FileNotFoundError:
+        return False
+    return stat.rsplit(")", 1)[1].split()[0] not in ("Z", "X")
+
+
+async def _assert_exits(pid: int) -> None:
+    for _ in range(100):
+        if not _is_alive(pid):
+            break
+        await asyncio.sleep(0.01)
+    assert not _is_alive(pid)
 
 
 class TestEnvStrip:
-    @pytest.mark.asyncio
-    async def test_env_strip_removes_keys(self):
+    def test_env_strip_removes_keys(self, monkeypatch):
         """API keys listed in env_strip must not leak to child processes."""
-        os.environ["ANTHROPIC_API_KEY"] = "sk-test-secret"
-        try:
-            tool = ExecTool(env_strip=["ANTHROPIC_API_KEY"])
-            result = await tool.execute("echo $ANTHROPIC_API_KEY")
-            assert "sk-test-secret" not in result
-        finally:
-            os.environ.pop("ANTHROPIC_API_KEY", None)
+        monkeypatch.setenv("ANTHROPIC_API_KEY", "sk-test-secret")
+        tool = ExecTool(env_strip=["ANTHROPIC_API_KEY"])
+        assert "ANTHROPIC_API_KEY" not in tool._build_env()
 
-    @pytest.mark.asyncio
-    async def test_env_strip_empty_preserves_env(self):
+    def test_env_strip_empty_preserves_env(self, monkeypatch):
         """An empty env_strip list should not remove any variables."""
-        os.environ["TEST_NANOBOT_VAR"] = "keep-me"
-        try:
-            tool = ExecTool(env_strip=[])
-            result = await tool.execute("echo $TEST_NANOBOT_VAR")
-            assert "keep-me" in result
-        finally:
-            os.environ.pop("TEST_NANOBOT_VAR", None)
+        monkeypatch.setenv("TEST_NANOBOT_VAR", "keep-me")
+        tool = ExecTool(env_strip=[])
+        assert tool._build_env()["TEST_NANOBOT_VAR"] == "keep-me"
+
+    def test_env_strip_ignores_unset_keys(self, monkeypatch):
+        monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+        tool = ExecTool(env_strip=["OPENAI_API_KEY"])
+        assert "OPENAI_API_KEY" not in tool._build_env()
+
+    def test_path_append_extends_path(self, monkeypatch):
+        monkeypatch.setenv("PATH", "/usr/bin")
+        tool = ExecTool(path_append="/opt/tools")
+        assert tool._build_env()["PATH"] == "/usr/bin" + os.pathsep + "/opt/tools"
+
+    @pytest.mark.integration
+    async def test_env_strip_applies_to_child_process(self, monkeypatch):
+        """The stripped environment is what the shell actually sees."""
+        monkeypatch.setenv("ANTHROPIC_API_KEY", "sk-test-secret")
+        tool = ExecTool(env_strip=["ANTHROPIC_API_KEY"])
+        result = await tool.execute("echo $ANTHROPIC_API_KEY")
+        assert "sk-test-secret" not in result
 
 
 class TestPerCallTimeout:
-    @pytest.mark.asyncio
-    async def test_per_call_timeout_overrides_default(self):
+    async def test_per_call_timeout_overrides_default(self, monkeypatch, fake_clock):
         """A per-call timeout should override the instance default."""
         tool = ExecTool(timeout=60)
-        # sleep 5 with a 1-second per-call timeout should time out
-        result = await tool.execute("sleep 5", timeout=1)
+        result = await _execute_until_timeout(monkeypatch, tool, fake_clock, 1.5, timeout=1)
         assert "timed out" in result
         assert "1 seconds" in result
 
-    @pytest.mark.asyncio
-    async def test_per_call_timeout_fallback_to_default(self):
+    async def test_per_call_timeout_fallback_to_default(self, monkeypatch, fake_clock):
         """Without per-call timeout, the instance default is used."""
         tool = ExecTool(timeout=1)
-        result = await tool.execute("sleep 5")
+        result = await _execute_until_timeout(monkeypatch, tool, fake_clock, 1.5)
         assert "timed out" in result
         assert "1 seconds" in result
 
-    @pytest.mark.asyncio
-    async def test_per_call_timeout_succeeds_within_limit(self):
-        """A fast command should succeed with a generous per-call timeout."""
-        tool = ExecTool(timeout=1)  # tight default
-        result = await tool.execute("echo ok", timeout=10)
-        assert "ok" in result
-        assert "timed out" not in result
+    async def test_timeout_falls_back_when_killpg_fails(self, monkeypatch, fake_clock):
+        """A refused killpg (EPERM) must still kill and reap the shell."""
+        process = _HangingProcess()
+        _patch_subprocess(monkeypatch, process)
+
+        def _refuse(pid: int, sig: int) -> None:
+            raise PermissionError(1, "Operation not permitted")
+
+        monkeypatch.setattr("nanobot.agent.tools.shell.os.killpg", _refuse)
+        task = asyncio.create_task(ExecTool(timeout=1).execute("sleep 5"))
+        await process.started.wait()
+        fake_clock.advance(1.5)
+        result = await task
+
+        assert "timed out" in result
+        assert process.kill_calls == 1
+
+    @pytest.mark.integration
+    @pytest.mark.skipif(not sys.platform.startswith("linux"), reason="inspects /proc")
+    async def test_timeout_kills_background_children(self, tmp_path):
+        """Processes the command backgrounded must not outlive the timeout."""
+        pid_file = tmp_path / "pid"
+        tool = ExecTool()
+        result = await tool.execute(f"sleep 30 & echo $! > {pid_file}; wait", timeout=0.5)
+        assert "timed out" in result
+
+        await _assert_exits(int(pid_file.read_text()))
+
+    @pytest.mark.integration
+    @pytest.mark.skipif(not sys.platform.startswith("linux"), reason="inspects /proc")
+    async def test_cancel_kills_background_children(self, tmp_path):
+        """Cancelling the call (e.g. /stop) must take the command down with it."""
+        pid_file = tmp_path / "pid"
+        tool = ExecTool()
+        task = asyncio.create_task(tool.execute(f"sleep 30 & echo $! > {pid_file}; wait"))
+        for _ in range(500):
+            if pid_file.exists() and pid_file.read_text().strip():
+                break
+            await asyncio.sleep(0.01)
+
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        await _assert_exits(int(pid_file.read_text()))
 
     def test_timeout_parameter_in_schema(self):
         """The timeout parameter should be exposed in the JSON schema."""
@@ -76,18 +248,94 @@ class TestPerCallTimeout:
 
 
 class TestMaxOutputChars:
-    @pytest.mark.asyncio
-    async def test_max_output_chars_truncation(self):
+    async def test_max_output_chars_truncation(self, monkeypatch):
         """Output exceeding max_output_chars must be truncated."""
+        _patch_subprocess(monkeypatch, _MockProcess(stdout=b"A" * 200))
         tool = ExecTool(max_output_chars=50)
-        result = await tool.execute("python3 -c \"print('A' * 200)\"")
+        result = await tool.execute("yes A | head -c 200")
         assert "truncated" in result
         assert len(result.split("\n... (truncated")[0]) <= 50
 
-    @pytest.mark.asyncio
-    async def test_max_output_chars_no_truncation(self):
-        """Short output should not be truncated."""
-        tool = ExecTool(max_output_chars=10000)
-        result = await tool.execute("echo hello")
-        assert "truncated" not in result
-        assert "hello" in result
+    async def test_max_output_chars_bounds_captured_bytes(self, monkeypatch):
+        """Only the head of a huge stream is kept in memory."""
+        process = _MockProcess()
+        process.stdout = _MockStream(b"A" * 4096, repeat=2560)  # 10 MiB
+        _patch_subprocess(monkeypatch, process)
+        tool = ExecTool(max_output_chars=1000)
+
+        tracemalloc.start()
+        try:
+            result = await tool.execute("yes A | head -c 10485760")
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        assert peak < 1_000_000
+        assert result.startswith("A" * 1000 + "\n... (truncated")
+        assert f"{4096 * 2560 - 1000} more chars" in result
+
+    async def test_reader_drains_past_cap_without_killing(self, monkeypatch):
+        """Overflowing the buffer must not stop the command early."""
+        process = _MockProcess()
+        process.stdout = _MockStream(b"A" * 4096, repeat=8)
+        _patch_subprocess(monkeypatch, process)
+        tool = ExecTool(max_output_chars=10)
+
+        result = await tool.execute("make all")
+
+        assert process.stdout.remaining == 0
+        assert set(process.stdout.read_sizes) == {4096}
+        assert process.kill_calls == 0
+        assert "truncated" in result
+
+    def test_output_buffer_keeps_head_and_counts_rest(self):
+        buf = _OutputBuffer(capacity=5)
+        buf.write(b"abc")
+        buf.write(b"defg")
+        buf.write(b"hij")
+        assert bytes(buf.data) == b"abcde"
+        assert buf.dropped == 5
+
+    def test_output_buffer_counts_dropped_multibyte_chars(self):
+        buf = _OutputBuffer(capacity=3)
+        buf.write("é€😀".encode())  # 2 + 3 + 4 bytes
+        assert bytes(buf.data) == "é".encode() + b"\xe2"
+        assert buf.dropped == 1  # only "😀"; the tail of "€" starts no new char
+
+    async def test_truncation_counts_multibyte_chars(self, monkeypatch):
+        """The 'more chars' count is in characters, not bytes."""
+        _patch_subprocess(monkeypatch, _MockProcess(stdout="é".encode() * 100))
+        tool = ExecTool(max_output_chars=10)
+        result = await tool.execute("printf é")
+        assert result == "é" * 10 + "\n... (truncated, 90 more chars)"
+
+
+# Cases that need a real shell: (tool kwargs, command, execute kwargs, check).
+EXEC_CASES = [
+    pytest.param(
+        {"timeout": 1},  # tight default
+        "echo ok",
+        {"timeout": 10},
+        lambda r: "ok" in r and "timed out" not in r,
+        id="per_call_timeout_succeeds_within_limit",
+    ),
+    pytest.param(
+        {"max_output_chars": 10000},
+        "echo hello",
+        {},
+        lambda r: "truncated" not in r and "hello" in r,
+        id="max_output_chars_no_truncation",
+    ),
+]
+
+
+@pytest.mark.integration
+@pytest.mark.parametrize("tool_kwargs,command,call_kwargs,check", EXEC_CASES)
+async def test_exec_case(
+    tool_kwargs: dict[str, Any],
+    command: str,
+    call_kwargs: dict[str, Any],
+    check: Callable[[str], bool],
+) -> None:
+    result = await ExecTool(**tool_kwargs).execute(command, **call_kwargs)
+    assert check(result), result
@@ -13,12 +13,17 @@ class _MockResponse:
         self._payload = payload
         self.status_code = status_code
         self.url = url
+        self._error_response: httpx.Response | None = None
 
     def raise_for_status(self) -> None:
-        if self.status_code >= 400:
+        if self.status_code < 400:
+            return
+        if self._error_response is None:
+            # Only built on the error path, then reused for repeated calls.
             request = httpx.Request("GET", self.url)
-            response = httpx.Response(self.status_code, request=request)
-            raise httpx.HTTPStatusError("request failed", request=request, response=response)
+            self._error_response = httpx.Response(self.status_code, request=request)
+        response = self._error_response
+        raise httpx.HTTPStatusError("request failed", request=response.request, response=response)
 
     def json(self) -> dict:
         return self._payload
@@ -26,8 +31,8 @@ class _MockResponse:
 
 class _MockAsyncClient:
     def __init__(self, response: _MockResponse | None = None, error: Exception | None = None) -> None:
-        self._response = response
-        self._error = error
+        self.response = response
+        self.error = error
         self.last_get: dict | None = None
         self.last_post: dict | None = None
 
@@ -39,96 +44,111 @@ class _MockAsyncClient:
 
     async def get(self, url: str, **kwargs):  # type: ignore[no-untyped-def]
         self.last_get = {"url": url, **kwargs}
-        if self._error:
-            raise self._error
-        assert self._response is not None
-        return self._response
+        if self.error:
+            raise self.error
+        assert self.response is not None
+        return self.response
 
     async def post(self, url: str, **kwargs):  # type: ignore[no-untyped-def]
         self.last_post = {"url": url, **kwargs}
-        if self._error:
-            raise self._error
-        assert self._response is not None
-        return self._response
+        if self.error:
+            raise self.error
+        assert self.response is not None
+        return self.response
 
 
-def _patch_async_client(monkeypatch: pytest.MonkeyPatch, client: _MockAsyncClient) -> None:
+BRAVE_RESULT = {
+    "web": {
+        "results": [
+            {
+                "title": "Brave Result",
+                "url": "https://example.com/brave",
+                "description": "A brave snippet",
+            }
+        ]
+    }
+}
+BRAVE_EMPTY = {"web": {"results": []}}
+TAVILY_RESULT = {
+    "results": [
+        {
+            "title": "Tavily Result",
+            "url": "https://example.com/tavily",
+            "content": "t" * 250,
+        }
+    ]
+}
+TAVILY_EMPTY = {"results": []}
+
+
+@pytest.fixture(scope="module")
+def brave_tool() -> WebSearchTool:
+    return WebSearchTool(api_key="brave-key", provider="brave")
+
+
+@pytest.fixture(scope="module")
+def tavily_tool() -> WebSearchTool:
+    return WebSearchTool(api_key="tavily-key", provider="tavily")
+
+
+@pytest.fixture
+def http_mock(monkeypatch: pytest.MonkeyPatch) -> _MockAsyncClient:
+    client = _MockAsyncClient()
     monkeypatch.setattr("nanobot.agent.tools.web.httpx.AsyncClient", lambda *a, **k: client)
+    return client
 
 
-def test_web_search_tool_initialization_brave_and_tavily() -> None:
-    brave = WebSearchTool(api_key="b-key", provider="brave", max_results=3)
-    tavily = WebSearchTool(api_key="t-key", provider="TAVILY", max_results=7)
+PROVIDER_ENV_VARS = [("brave", "BRAVE_API_KEY"), ("tavily", "TAVILY_API_KEY")]
 
-    assert brave.provider == "brave"
-    assert brave.max_results == 3
-    assert tavily.provider == "tavily"
-    assert tavily.max_results == 7
 
+@pytest.mark.parametrize(
+    "provider,expected_provider,max_results",
+    [("brave", "brave", 3), ("TAVILY", "tavily", 7)],
+)
+def test_web_search_tool_initialization(provider: str, expected_provider: str, max_results: int) -> None:
+    tool = WebSearchTool(api_key="key", provider=provider, max_results=max_results)
 
-def test_api_key_resolution_prefers_init_key_for_both_providers(monkeypatch: pytest.MonkeyPatch) -> None:
-    monkeypatch.setenv("BRAVE_API_KEY", "env-brave")
-    monkeypatch.setenv("TAVILY_API_KEY", "env-tavily")
+    assert tool.provider == expected_provider
+    assert tool.max_results == max_results
 
-    brave = WebSearchTool(api_key="init-brave", provider="brave")
-    tavily = WebSearchTool(api_key="init-tavily", provider="tavily")
 
-    assert brave.api_key == "init-brave"
-    assert tavily.api_key == "init-tavily"
+@pytest.mark.parametrize("provider,env_var", PROVIDER_ENV_VARS)
+def test_api_key_resolution_prefers_init_key(
+    monkeypatch: pytest.MonkeyPatch, provider: str, env_var: str
+) -> None:
+    monkeypatch.setenv(env_var, f"env-{provider}")
 
+    tool = WebSearchTool(api_key=f"init-{provider}", provider=provider)
 
-def test_api_key_resolution_env_fallback_for_both_providers(monkeypatch: pytest.MonkeyPatch) -> None:
-    monkeypatch.setenv("BRAVE_API_KEY", "env-brave")
-    monkeypatch.setenv("TAVILY_API_KEY", "env-tavily")
+    assert tool.api_key == f"init-{provider}"
 
-    brave = WebSearchTool(provider="brave")
-    tavily = WebSearchTool(provider="tavily")
 
-    assert brave.api_key == "env-brave"
-    assert tavily.api_key == "env-tavily"
+@pytest.mark.parametrize("provider", ["brave", "tavily"])
+def test_api_key_resolution_env_fallback(monkeypatch: pytest.MonkeyPatch, provider: str) -> None:
+    for name, var in PROVIDER_ENV_VARS:
+        monkeypatch.setenv(var, f"env-{name}")
 
+    tool = WebSearchTool(provider=provider)
 
-@pytest.mark.asyncio
-async def test_brave_search_execution(monkeypatch: pytest.MonkeyPatch) -> None:
-    payload = {
-        "web": {
-            "results": [
-                {
-                    "title": "Brave Result",
-                    "url": "https://example.com/brave",
-                    "description": "A brave snippet",
-                }
-            ]
-        }
-    }
-    client = _MockAsyncClient(response=_MockResponse(payload))
-    _patch_async_client(monkeypatch, client)
+    assert tool.api_key == f"env-{provider}"
+
+
+async def test_brave_search_execution(http_mock: _MockAsyncClient, brave_tool: WebSearchTool) -> None:
+    http_mock.response = _MockResponse(BRAVE_RESULT)
 
-    tool = WebSearchTool(api_key="brave-key", provider="brave")
-    result = await tool.execute(query="nanobot")
+    result = await brave_tool.execute(query="nanobot")
 
     assert "Results for: nanobot" in result
     assert "Brave Result" in result
     assert "A brave snippet" in result
-    assert client.last_get is not None
-    assert client.last_get["url"] == "https://api.search.brave.com/res/v1/web/search"
-    assert client.last_get["params"] == {"q": "nanobot", "count": 5}
-    assert client.last_get["headers"]["X-Subscription-Token"] == "brave-key"
+    assert http_mock.last_get is not None
+    assert http_mock.last_get["url"] == "https://api.search.brave.com/res/v1/web/search"
+    assert http_mock.last_get["params"] == {"q": "nanobot", "count": 5}
+    assert http_mock.last_get["headers"]["X-Subscription-Token"] == "brave-key"
 
 
-@pytest.mark.asyncio
-async def test_tavily_search_execution(monkeypatch: pytest.MonkeyPatch) -> None:
-    payload = {
-        "results": [
-            {
-                "title": "Tavily Result",
-                "url": "https://example.com/tavily",
-                "content": "t" * 250,
-            }
-        ]
-    }
-    client = _MockAsyncClient(response=_MockResponse(payload))
-    _patch_async_client(monkeypatch, client)
+async def test_tavily_search_execution(http_mock: _MockAsyncClient) -> None:
+    http_mock.response = _MockResponse(TAVILY_RESULT)
 
     tool = WebSearchTool(api_key="tavily-key", provider="tavily", max_results=4)
     result = await tool.execute(query="nanobot", count=2)
@@ -137,16 +157,15 @@ async def test_tavily_search_execution(monkeypatch: pytest.MonkeyPatch) -> None:
     assert "Tavily Result" in result
     assert "https://example.com/tavily" in result
     assert "t" * 50 in result  # content is included
-    assert client.last_post is not None
-    assert client.last_post["url"] == "https://api.tavily.com/search"
-    assert client.last_post["json"] == {
+    assert http_mock.last_post is not None
+    assert http_mock.last_post["url"] == "https://api.tavily.com/search"
+    assert http_mock.last_post["json"] == {
         "api_key": "tavily-key",
         "query": "nanobot",
         "max_results": 2,
     }
 
 
-@pytest.mark.asyncio
 async def test_error_handling_when_no_api_key(monkeypatch: pytest.MonkeyPatch) -> None:
     monkeypatch.delenv("BRAVE_API_KEY", raising=False)
     monkeypatch.delenv("TAVILY_API_KEY", raising=False)
@@ -162,37 +181,27 @@ async def test_error_handling_when_no_api_key(monkeypatch: pytest.MonkeyPatch) -
     assert "TAVILY_API_KEY" in tavily_result
 
 
-@pytest.mark.asyncio
-async def test_error_handling_when_api_call_fails(monkeypatch: pytest.MonkeyPatch) -> None:
-    client = _MockAsyncClient(error=httpx.ConnectTimeout("timeout"))
-    _patch_async_client(monkeypatch, client)
+async def test_error_handling_when_api_call_fails(http_mock: _MockAsyncClient, brave_tool: WebSearchTool) -> None:
+    http_mock.error = httpx.ConnectTimeout("timeout")
 
-    tool = WebSearchTool(api_key="brave-key", provider="brave")
-    result = await tool.execute(query="nanobot")
+    result = await brave_tool.execute(query="nanobot")
 
     assert result.startswith("Error:")
     assert "timeout" in result
 
 
-@pytest.mark.asyncio
-async def test_error_handling_when_http_error(monkeypatch: pytest.MonkeyPatch) -> None:
-    client = _MockAsyncClient(response=_MockResponse(payload={}, status_code=500, url="https://api.tavily.com/search"))
-    _patch_async_client(monkeypatch, client)
+async def test_error_handling_when_http_error(http_mock: _MockAsyncClient, tavily_tool: WebSearchTool) -> None:
+    http_mock.response = _MockResponse(payload={}, status_code=500, url="https://api.tavily.com/search")
 
-    tool = WebSearchTool(api_key="tavily-key", provider="tavily")
-    result = await tool.execute(query="nanobot")
+    result = await tavily_tool.execute(query="nanobot")
 
     assert result.startswith("Error:")
 
 
-@pytest.mark.asyncio
-async def test_brave_search_returns_no_results_message(monkeypatch: pytest.MonkeyPatch) -> None:
-    payload = {"web": {"results": []}}
-    client = _MockAsyncClient(response=_MockResponse(payload))
-    _patch_async_client(monkeypatch, client)
+async def test_brave_search_returns_no_results_message(http_mock: _MockAsyncClient, brave_tool: WebSearchTool) -> None:
+    http_mock.response = _MockResponse(BRAVE_EMPTY)
 
-    tool = WebSearchTool(api_key="brave-key", provider="brave")
-    result = await tool.execute(query="nothing-here")
+    result = await brave_tool.execute(query="nothing-here")
 
     assert result == "No results for: nothing-here"
 
@@ -210,80 +219,93 @@ def test_web_search_config_schema_validation_rejects_invalid_provider() -> None:
         WebSearchConfig(provider="duckduckgo", api_key="x", max_results=5)
 
 
-def test_config_maps_camel_case_web_search_fields() -> None:
-    cfg = Config.model_validate(
-        {
-            "tools": {
-                "web": {
-                    "search": {
-                        "provider": "tavily",
-                        "apiKey": "cfg-key",
-                        "maxResults": 9,
-                    }
-                }
+CAMEL_CASE_CONFIG = {
+    "tools": {
+        "web": {
+            "search": {
+                "provider": "tavily",
+                "apiKey": "cfg-key",
+                "maxResults": 9,
+            }
+        }
+    }
+}
+LEGACY_CONFIG = {
+    "tools": {
+        "web": {
+            "search": {
+                "apiKey": "legacy-key",
+                "maxResults": 4,
             }
         }
-    )
+    }
+}
 
-    assert cfg.tools.web.search.provider == "tavily"
-    assert cfg.tools.web.search.api_key == "cfg-key"
-    assert cfg.tools.web.search.max_results == 9
 
+@pytest.fixture(scope="session")
+def config(request: pytest.FixtureRequest) -> Config:
+    return Config.model_validate(request.param)
 
-def test_config_back_compat_defaults_provider_when_only_legacy_api_key_is_set() -> None:
-    cfg = Config.model_validate(
-        {
-            "tools": {
-                "web": {
-                    "search": {
-                        "apiKey": "legacy-key",
-                        "maxResults": 4,
-                    }
-                }
-            }
-        }
-    )
 
-    assert cfg.tools.web.search.provider == "brave"
-    assert cfg.tools.web.search.api_key == "legacy-key"
-    assert cfg.tools.web.search.max_results == 4
+@pytest.mark.parametrize("config", [CAMEL_CASE_CONFIG], ids=["camelCase"], indirect=True)
+def test_config_maps_camel_case_web_search_fields(config: Config) -> None:
+    assert config.tools.web.search.provider == "tavily"
+    assert config.tools.web.search.api_key == "cfg-key"
+    assert config.tools.web.search.max_results == 9
+
 
+@pytest.mark.parametrize("config", [LEGACY_CONFIG], ids=["legacy"], indirect=True)
+def test_config_back_compat_defaults_provider_when_only_legacy_api_key_is_set(config: Config) -> None:
+    assert config.tools.web.search.provider == "brave"
+    assert config.tools.web.search.api_key == "legacy-key"
+    assert config.tools.web.search.max_results == 4
 
-@pytest.mark.asyncio
-async def test_tavily_count_is_clamped_to_maximum(monkeypatch: pytest.MonkeyPatch) -> None:
-    payload = {"results": []}
-    client = _MockAsyncClient(response=_MockResponse(payload))
-    _patch_async_client(monkeypatch, client)
 
-    tool = WebSearchTool(api_key="tavily-key", provider="tavily")
-    await tool.execute(query="nanobot", count=50)
+def _brave_count(client: _MockAsyncClient) -> int:
+    assert client.last_get is not None
+    return client.last_get["params"]["count"]
+
 
+def _tavily_count(client: _MockAsyncClient) -> int:
     assert client.last_post is not None
-    assert client.last_post["json"]["max_results"] == 10
+    return client.last_post["json"]["max_results"]
 
 
-@pytest.mark.asyncio
-async def test_brave_count_is_clamped_to_maximum(monkeypatch: pytest.MonkeyPatch) -> None:
-    payload = {"web": {"results": []}}
-    client = _MockAsyncClient(response=_MockResponse(payload))
-    _patch_async_client(monkeypatch, client)
+# provider -> (empty payload, how the requested count reaches the API)
+_COUNT_DISPATCH = {
+    "brave": (BRAVE_EMPTY, _brave_count),
+    "tavily": (TAVILY_EMPTY, _tavily_count),
+}
 
-    tool = WebSearchTool(api_key="brave-key", provider="brave")
-    await tool.execute(query="nanobot", count=999)
 
-    assert client.last_get is not None
-    assert client.last_get["params"]["count"] == 10
+@pytest.mark.parametrize(
+    "provider,requested,expected",
+    [("brave", 999, 10), ("tavily", 50, 10), ("brave", 3, 3), ("tavily", 7, 7)],
+)
+async def test_count_is_clamped_to_maximum(
+    request: pytest.FixtureRequest,
+    http_mock: _MockAsyncClient,
+    provider: str,
+    requested: int,
+    expected: int,
+) -> None:
+    payload, sent_count = _COUNT_DISPATCH[provider]
+    http_mock.response = _MockResponse(payload)
 
+    tool: WebSearchTool = request.getfixturevalue(f"{provider}_tool")
+    await tool.execute(query="nanobot", count=requested)
 
-@pytest.mark.asyncio
-async def test_unknown_provider_falls_back_to_brave_search(monkeypatch: pytest.MonkeyPatch) -> None:
-    payload = {"web": {"results": []}}
-    client = _MockAsyncClient(response=_MockResponse(payload))
-    _patch_async_client(monkeypatch, client)
+    assert sent_count(http_mock) == expected
+
+
+async def test_unknown_provider_falls_back_to_brave_search(
+    monkeypatch: pytest.MonkeyPatch, http_mock: _MockAsyncClient
+) -> None:
+    http_mock.response = _MockResponse(BRAVE_EMPTY)
 
     monkeypatch.setenv("BRAVE_API_KEY", "env-brave")
     tool = WebSearchTool(provider="not-a-provider")
     await tool.execute(query="nanobot")
 
-    assert client.last_get is not None
-    assert client.last_get["url"] == "https://api.search.brave.com/res/v1/web/search"
+    assert http_mock.last_get is not None
+    assert http_mock.last_get["url"] == "https://api.search.brave.com/res/v1/web/search"